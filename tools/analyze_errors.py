@@ -5,12 +5,31 @@ Parses error.log or debug.log and groups messages by type with occurrence counts
 Exports results to a markdown report file.
 """
 
+import mmap
+import os
 import re
 import sys
-from collections import defaultdict
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime
 
+# One pass classifies a line. Alternatives are tried in order from the start
+# of the line, so a line containing both "Error:" and a timestamp prefix is
+# still an error line, exactly as with separate searches. The pattern runs over
+# the raw bytes of the whole file, so nothing may match across a newline, and
+# a captured group may not start on the \r of a CRLF line ending.
+LINE_RE = re.compile(
+    rb'^(?:.*?Error:[^\S\n]*(?P<error>[^\r\n].*)'
+    rb'|.*?Warning:[^\S\n]*(?P<warning>[^\r\n].*)'
+    rb'|.*?\[\d+:\d+:\d+\]\[(?P<source>[^\]\n]+)\]:[^\S\n]*(?P<message>[^\r\n].*)'
+    rb'|.*?Script location:[^\S\n]*(?P<location>[^\r\n].*))',
+    re.MULTILINE,
+)
+NOISE_RE = re.compile(r'load(?:ing|ed)|initializ(?:ing|ed)', re.IGNORECASE)
+FILE_RE = re.compile(r'(?:file|in|at)\s+["\']?([^"\':\s]+\.(txt|gui|gfx|yml))["\']?(?::(\d+))?', re.IGNORECASE)
+
+DEBUG_CACHE_SIZE = 4096
+
 
 def parse_log(log_path: str, mod_filter: str = None) -> dict:
     """
@@ -21,141 +40,201 @@ def parse_log(log_path: str, mod_filter: str = None) -> dict:
         mod_filter: Optional string to filter only messages from specific mod files
 
     Returns:
-        Dict with message signatures as keys and message data as values
+        Dict with message signatures as keys and [count, example, locations]
+        lists as values. locations is None, a single location string, or a
+        set once a second distinct location is seen.
     """
-    messages = defaultdict(lambda: {"count": 0, "locations": set(), "example": ""})
+    messages = {}
 
     current_message = None
     current_location = None
+    debug_cache = {}
+
+    for error, warning, source, msg, location in _iter_log_lines(log_path):
+        # Match error message line (Error: ...)
+        if error is not None:
+            current_message = f"ERROR: {error.decode('utf-8', 'ignore').strip()}"
+            continue
+
+        # Match warning message line (Warning: ...)
+        if warning is not None:
+            current_message = f"WARNING: {warning.decode('utf-8', 'ignore').strip()}"
+            continue
+
+        # Match debug/info messages with timestamp [HH:MM:SS][source]: message
+        if source is not None:
+            # Repeated debug lines share their parsed result; only the first
+            # occurrence pays for decoding and the noise/file regexes. Noise
+            # and filtered lines are not kept, and the cache is dropped once
+            # it fills, so memory stays bounded on huge logs.
+            key = (source, msg)
+            parsed = debug_cache.get(key)
+            if parsed is None:
+                parsed = _parse_debug_message(source, msg, mod_filter)
+                if parsed is None:
+                    continue
+                if len(debug_cache) >= DEBUG_CACHE_SIZE:
+                    debug_cache.clear()
+                debug_cache[key] = parsed
 
-    with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            # Match error message line (Error: ...)
-            error_match = re.search(r'Error:\s*(.+)', line)
-            if error_match:
-                current_message = f"ERROR: {error_match.group(1).strip()}"
-                continue
+            _record(messages, *parsed)
+            continue
+
+        # Match script location line (follows Error/Warning)
+        if current_message:
+            current_location = location.decode('utf-8', 'ignore').strip()
 
-            # Match warning message line (Warning: ...)
-            warning_match = re.search(r'Warning:\s*(.+)', line)
-            if warning_match:
-                current_message = f"WARNING: {warning_match.group(1).strip()}"
+            # Apply mod filter if specified
+            if mod_filter and mod_filter not in current_location:
+                current_message = None
+                current_location = None
                 continue
 
-            # Match debug/info messages with timestamp [HH:MM:SS][source]: message
-            debug_match = re.search(r'\[\d+:\d+:\d+\]\[([^\]]+)\]:\s*(.+)', line)
-            if debug_match:
-                source = debug_match.group(1)
-                msg = debug_match.group(2).strip()
+            # Create signature (message + file, ignoring line number)
+            head, sep, line_num = current_location.rpartition(':')
+            file_path = head if sep and line_num.isdecimal() else current_location
+            signature = sys.intern(f"{current_message} @ {file_path}")
 
-                # Skip common noise
-                if any(skip in msg.lower() for skip in ['loading', 'loaded', 'initializing', 'initialized']):
-                    continue
+            _record(messages, signature, current_location, current_location)
 
-                # Check for file location in the message itself
-                file_match = re.search(r'(?:file|in|at)\s+["\']?([^"\':\s]+\.(txt|gui|gfx|yml))["\']?(?::(\d+))?', msg, re.IGNORECASE)
-                if file_match:
-                    file_loc = file_match.group(1)
-                    line_num = file_match.group(3) or "?"
+            current_message = None
+            current_location = None
 
-                    if mod_filter and mod_filter not in file_loc:
-                        continue
+    return messages
 
-                    signature = f"{source}: {msg}"
-                    messages[signature]["count"] += 1
-                    messages[signature]["locations"].add(f"{file_loc}:{line_num}")
-                    if not messages[signature]["example"]:
-                        messages[signature]["example"] = msg
-                    continue
 
-                # General debug message without file location
-                signature = f"{source}: {msg}"
-                messages[signature]["count"] += 1
-                if not messages[signature]["example"]:
-                    messages[signature]["example"] = msg
-                continue
+def _record(messages: dict, signature: str, location: str, example: str):
+    """Count one occurrence of signature, creating the entry on first sight."""
+    entry = messages.get(signature)
+    if entry is None:
+        messages[signature] = [1, example, location]
+        return
+
+    entry[0] += 1
+    if not entry[1]:
+        entry[1] = example
+    if location is None:
+        return
+    # Most signatures only ever see one location; only build a set once a
+    # second distinct one turns up.
+    locations = entry[2]
+    if locations is None:
+        entry[2] = location
+    elif isinstance(locations, str):
+        if locations != location:
+            entry[2] = {locations, location}
+    else:
+        locations.add(location)
+
+
+def _parse_debug_message(source: bytes, msg: bytes, mod_filter: str = None):
+    """
+    Turn a raw debug line into (signature, location, example).
 
-            # Match script location line (follows Error/Warning)
-            location_match = re.search(r'Script location:\s*(.+)', line)
-            if location_match and current_message:
-                current_location = location_match.group(1).strip()
+    Returns None when the line is noise or falls outside mod_filter. location
+    is None for messages that do not name a script file.
+    """
+    source = source.decode('utf-8', 'ignore')
+    msg = msg.decode('utf-8', 'ignore').strip()
 
-                # Apply mod filter if specified
-                if mod_filter and mod_filter not in current_location:
-                    current_message = None
-                    current_location = None
-                    continue
+    # Skip common noise
+    if NOISE_RE.search(msg):
+        return None
 
-                # Create signature (message + file, ignoring line number)
-                file_path = re.sub(r':\d+$', '', current_location)
-                signature = f"{current_message} @ {file_path}"
+    signature = sys.intern(f"{source}: {msg}")
 
-                messages[signature]["count"] += 1
-                messages[signature]["locations"].add(current_location)
-                if not messages[signature]["example"]:
-                    messages[signature]["example"] = current_location
+    # Check for file location in the message itself. A script file reference
+    # always has an extension, so messages without a dot skip the regex.
+    file_match = FILE_RE.search(msg) if '.' in msg else None
+    if file_match:
+        file_loc = file_match.group(1)
+        line_num = file_match.group(3) or "?"
 
-                current_message = None
-                current_location = None
+        if mod_filter and mod_filter not in file_loc:
+            return None
 
-    return messages
+        return signature, f"{file_loc}:{line_num}", msg
+
+    # General debug message without file location
+    return signature, None, msg
+
+
+def _iter_log_lines(log_path: str):
+    """
+    Yield the raw LINE_RE groups for every classified line of a log file.
+
+    The file is memory-mapped and scanned in a single finditer pass, so lines
+    that match nothing never reach Python.
+    """
+    with open(log_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for line_match in LINE_RE.finditer(buf):
+                yield line_match.groups()
 
 
 def export_report(messages: dict, output_path: str, log_path: str, mod_filter: str = None):
     """Export formatted report to markdown file."""
 
-    sorted_messages = sorted(messages.items(), key=lambda x: x[1]["count"], reverse=True)
-    total_messages = sum(e["count"] for _, e in sorted_messages)
+    sorted_messages = sorted(messages.items(), key=lambda x: x[1][0], reverse=True)
+    total_messages = sum(map(itemgetter(0), messages.values()))
     unique_types = len(sorted_messages)
 
     log_name = Path(log_path).name
 
+    # Split each signature into message and file once; both sections use it.
+    rows = []
+    for signature, (count, example, locations) in sorted_messages:
+        msg, sep, file_path = signature.partition(" @ ")
+        rows.append((msg, file_path if sep else "-", count, example, locations))
+
+    # Assemble the whole report in memory and hand it to the file in a single
+    # write; large logs produce tens of thousands of rows.
+    out = []
+    write = out.append
+    write(f"# EU5 Log Analysis: {log_name}\n\n")
+    write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    write(f"**Source:** `{log_path}`\n\n")
+    if mod_filter:
+        write(f"**Filter:** `{mod_filter}`\n\n")
+    write(f"**Total Messages:** {total_messages:,}\n\n")
+    write(f"**Unique Types:** {unique_types}\n\n")
+    write("---\n\n")
+
+    write("## Summary Table\n\n")
+    write("| # | Count | Message | File |\n")
+    write("|---|-------|---------|------|\n")
+
+    for i, (msg, file_path, count, _, _) in enumerate(rows, 1):
+        file_short = file_path.rpartition("/")[2]
+        write(f"| {i} | {count:,} | {msg} | {file_short} |\n")
+
+    write("\n---\n\n")
+    write("## Detailed Breakdown\n\n")
+
+    for i, (msg, file_path, count, example, locations) in enumerate(rows, 1):
+        write(f"### {i}. {msg}\n\n")
+        write(f"**Count:** {count:,}\n\n")
+        if file_path != "-":
+            write(f"**File:** `{file_path}`\n\n")
+
+        if isinstance(locations, str):
+            locations = (locations,)
+        if locations and len(locations) <= 10:
+            lines = sorted([loc.rpartition(":")[2] for loc in locations if ":" in loc], key=lambda x: int(x) if x.isdigit() else 0)
+            if lines:
+                write(f"**Lines:** {', '.join(lines)}\n\n")
+        elif locations:
+            write(f"**Unique locations:** {len(locations)}\n\n")
+
+        if example and example != file_path:
+            write(f"**Example:** `{example}`\n\n")
+
+        write("---\n\n")
+
     with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(f"# EU5 Log Analysis: {log_name}\n\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        f.write(f"**Source:** `{log_path}`\n\n")
-        if mod_filter:
-            f.write(f"**Filter:** `{mod_filter}`\n\n")
-        f.write(f"**Total Messages:** {total_messages:,}\n\n")
-        f.write(f"**Unique Types:** {unique_types}\n\n")
-        f.write("---\n\n")
-
-        f.write("## Summary Table\n\n")
-        f.write("| # | Count | Message | File |\n")
-        f.write("|---|-------|---------|------|\n")
-
-        for i, (signature, data) in enumerate(sorted_messages, 1):
-            parts = signature.split(" @ ", 1)
-            msg = parts[0]
-            file_path = parts[1] if len(parts) > 1 else "-"
-            file_short = file_path.split("/")[-1] if "/" in file_path else file_path
-            f.write(f"| {i} | {data['count']:,} | {msg} | {file_short} |\n")
-
-        f.write("\n---\n\n")
-        f.write("## Detailed Breakdown\n\n")
-
-        for i, (signature, data) in enumerate(sorted_messages, 1):
-            parts = signature.split(" @ ", 1)
-            msg = parts[0]
-            file_path = parts[1] if len(parts) > 1 else "-"
-
-            f.write(f"### {i}. {msg}\n\n")
-            f.write(f"**Count:** {data['count']:,}\n\n")
-            if file_path != "-":
-                f.write(f"**File:** `{file_path}`\n\n")
-
-            locations = data["locations"]
-            if locations and len(locations) <= 10:
-                lines = sorted([loc.split(":")[-1] for loc in locations if ":" in loc], key=lambda x: int(x) if x.isdigit() else 0)
-                if lines:
-                    f.write(f"**Lines:** {', '.join(lines)}\n\n")
-            elif locations:
-                f.write(f"**Unique locations:** {len(locations)}\n\n")
-
-            if data["example"] and data["example"] != file_path:
-                f.write(f"**Example:** `{data['example']}`\n\n")
-
-            f.write("---\n\n")
+        f.write("".join(out))
 
 
 def main():
@@ -176,7 +255,7 @@ def main():
     messages = parse_log(log_path, mod_filter)
     export_report(messages, output_path, log_path, mod_filter)
 
-    total = sum(e["count"] for e in messages.values())
+    total = sum(map(itemgetter(0), messages.values()))
     print(f"Analyzed {total:,} messages, {len(messages)} unique types")
     print(f"Report saved to: {output_path}")
 
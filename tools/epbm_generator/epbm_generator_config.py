@@ -62,6 +62,14 @@ MOD_IN_GAME = _MOD_ROOT / "in_game"
 # under this root.
 OUTPUT_ROOT = _MOD_ROOT
 
+# ─────────────────────────────────────────────
+# Parse cache
+# ─────────────────────────────────────────────
+# Parsed script files are cached here between runs, keyed by path, mtime and
+# size, so unchanged vanilla files are not re-parsed every time. Safe to
+# delete at any time. Set to None to disable caching.
+PARSE_CACHE = _HERE / ".parse_cache.pickle"
+
 # ─────────────────────────────────────────────
 # Safety toggles
 # ─────────────────────────────────────────────
@@ -61,11 +61,17 @@ CONFIGURATION
 All tunables live in `epbm_generator_config.py` next to this script.
 """
 
+import hashlib
+import io
 import os
+import pickle
 import re
 import sys
-from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from operator import attrgetter
 from pathlib import Path
+from typing import NamedTuple, Optional
 
 # Import the user-editable configuration. Must sit next to this script.
 _SCRIPT_DIR = Path(__file__).resolve().parent
@@ -77,7 +83,13 @@ import epbm_generator_config as cfg  # noqa: E402
 # Constants
 # ═════════════════════════════════════════════════════════════════════════
 
-PM_META_KEYS = {"category", "no_upkeep", "potential", "produced", "output"}
+PM_META_KEYS = frozenset({"category", "no_upkeep", "potential", "produced", "output"})
+
+# Plain decimal literal, the only number form Paradox script uses.
+_NUM_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)')
+
+
+_SCRIPT_VALUE_RE = re.compile(r'^(\w+)\s*=\s*([\d.]+)\s*$')
 
 
 def parse_employment_values(vanilla_dir, mod_dir=None, buildings=None):
@@ -90,7 +102,7 @@ def parse_employment_values(vanilla_dir, mod_dir=None, buildings=None):
     needed = set()
     if buildings:
         for bdata in buildings.values():
-            emp = bdata.get('employment_size')
+            emp = bdata.employment_size
             if emp and not _is_numeric(emp):
                 needed.add(emp)
 
@@ -105,17 +117,14 @@ def parse_employment_values(vanilla_dir, mod_dir=None, buildings=None):
         if mod_sv.exists():
             search_dirs.append(mod_sv)
 
-    pat = re.compile(r'^(\w+)\s*=\s*([\d.]+)\s*$')
     for d in search_dirs:
-        for f in sorted(d.iterdir()):
-            if not f.name.endswith(".txt"):
-                continue
+        for f in sorted(d.glob("*.txt")):
             try:
                 text = f.read_text(encoding="utf-8-sig")
             except Exception:
                 continue
             for line in text.splitlines():
-                m = pat.match(line.strip())
+                m = _SCRIPT_VALUE_RE.match(line.strip())
                 if m:
                     name = m.group(1)
                     if needed and name not in needed:
@@ -125,13 +134,9 @@ def parse_employment_values(vanilla_dir, mod_dir=None, buildings=None):
 
 
 def _is_numeric(s):
-    try:
-        float(s)
-        return True
-    except (ValueError, TypeError):
-        return False
+    return isinstance(s, str) and _NUM_RE.fullmatch(s) is not None
 
-SKIP_FILES = {"readme.txt", "__readme.txt", "00_unique_buildings_to_make_obsolete.txt"}
+SKIP_FILES = frozenset({"readme.txt", "__readme.txt", "00_unique_buildings_to_make_obsolete.txt"})
 
 PREFIX = cfg.PREFIX
 
@@ -170,8 +175,31 @@ def _write_output(path, content, encoding="utf-8-sig"):
         if current != content:
             _record_diff(path, 'changed')
         return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding=encoding)
+    # main creates the output directories up front. Encode here and write
+    # bytes: no text-layer wrapper, and the file gets the same LF line
+    # endings on every platform.
+    _atomic_write(path, content.encode(encoding))
+
+
+def _atomic_write(path, data):
+    """Write data next to path, then rename it into place.
+
+    The game or an editor never sees a half-written file, and an
+    interrupted run leaves the previous output intact.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
 
 def _delete_stale(path):
@@ -196,148 +224,267 @@ def strip_bom(text):
     return text.lstrip("﻿")
 
 
-def strip_comments(text):
-    lines = []
-    for line in text.split("\n"):
-        in_quote = False
-        result = []
-        for ch in line:
-            if ch == '"':
-                in_quote = not in_quote
-            elif ch == '#' and not in_quote:
-                break
-            result.append(ch)
-        lines.append("".join(result))
-    return "\n".join(lines)
+# One alternative per token kind; whitespace between tokens is skipped by
+# finditer. A '#' outside a quoted string starts a comment running to the
+# next \r or \n, which is matched and dropped in the same pass. Quoted strings
+# keep their escapes verbatim (a backslash only protects the next character
+# from closing the string) and run to the end of the text if unterminated.
+# Operator runs (`=`, `>=`, `!=`, ...) are one token; a bare word may contain
+# `!<>` after its first character.
+_TOKEN_RE = re.compile(
+    r'#[^\r\n]*'
+    r'|"((?:[^"\\]|\\.?)*)"?'
+    r'|([{}])'
+    r'|([=!<>]+)'
+    r'|([^ \t\r\n{}"=!<>#][^ \t\r\n{}"=#]*)',
+    re.DOTALL,
+)
 
 
 def tokenize(text):
-    text = strip_bom(text)
-    text = strip_comments(text)
-    i = 0
-    n = len(text)
-    while i < n:
-        if text[i] in " \t\r\n":
-            i += 1
-            continue
-        if text[i] == '"':
-            j = i + 1
-            while j < n and text[j] != '"':
-                if text[j] == '\\':
-                    j += 1
-                j += 1
-            yield text[i + 1:j]
-            i = j + 1
-            continue
-        if text[i] in '{}':
-            yield text[i]
-            i += 1
-            continue
-        if text[i] in '=!<>':
-            j = i + 1
-            while j < n and text[j] in '=!<>':
-                j += 1
-            yield text[i:j]
-            i = j
-            continue
-        j = i
-        while j < n and text[j] not in " \t\r\n{}=\"":
-            j += 1
-        yield text[i:j]
-        i = j
-
-
-def parse_block(tokens, idx):
-    assert tokens[idx] == '{', f"Expected '{{' at index {idx}, got '{tokens[idx]}'"
-    idx += 1
-    result = OrderedDict()
-    while idx < len(tokens) and tokens[idx] != '}':
-        key = tokens[idx]
-        idx += 1
+    # Bare words are mostly keys repeated across every file (category,
+    # modifier, ...); interning makes them one shared object each, which
+    # also lets pickling results out of worker processes memoize them.
+    intern = sys.intern
+    for m in _TOKEN_RE.finditer(strip_bom(text)):
+        kind = m.lastindex
+        if kind == 4:
+            yield intern(m.group(4))
+        elif kind == 1:
+            # Files are decoded without newline translation, so give quoted
+            # strings that span lines the \n endings read_text would have.
+            s = m.group(1)
+            if '\r' in s:
+                s = s.replace('\r\n', '\n').replace('\r', '\n')
+            yield s
+        elif kind:
+            yield m.group(kind)
+
+
+class _Peekable:
+    """Token stream with one token of lookahead; peek() is None at the end."""
+
+    __slots__ = ("_it", "_head")
+
+    def __init__(self, tokens):
+        self._it = iter(tokens)
+        self._head = next(self._it, None)
+
+    def peek(self):
+        return self._head
+
+    def next(self):
+        tok = self._head
+        if tok is None:
+            raise IndexError("unexpected end of script")
+        self._head = next(self._it, None)
+        return tok
+
+
+def parse_block(tok):
+    assert tok.peek() == '{', f"Expected '{{', got {tok.peek()!r}"
+    peek = tok.peek
+    advance = tok.next
+    advance()
+    result = {}
+    while True:
+        key = peek()
+        if key is None or key == '}':
+            break
         if key == '{':
-            _, idx = parse_block(tokens, idx - 1)
+            parse_block(tok)
             continue
-        if idx < len(tokens) and tokens[idx] == '=':
-            idx += 1
-            if idx < len(tokens) and tokens[idx] == '{':
-                val, idx = parse_block(tokens, idx)
+        advance()
+        nxt = peek()
+        if nxt == '=':
+            advance()
+            if peek() == '{':
+                val = parse_block(tok)
             else:
-                val = tokens[idx]
-                idx += 1
-        elif idx < len(tokens) and tokens[idx] == '{':
-            val, idx = parse_block(tokens, idx)
+                val = advance()
+        elif nxt == '{':
+            val = parse_block(tok)
         else:
             val = True
-            if key in result:
-                if isinstance(result[key], list):
-                    result[key].append(val)
-                else:
-                    result[key] = [result[key], val]
-                continue
-            result[key] = val
-            continue
+        # Most keys are unique, so the membership test stays the fast path;
+        # only repeated keys look the existing value up again.
         if key in result:
-            if isinstance(result[key], list):
-                result[key].append(val)
+            cur = result[key]
+            if isinstance(cur, list):
+                cur.append(val)
             else:
-                result[key] = [result[key], val]
+                result[key] = [cur, val]
         else:
             result[key] = val
-    if idx < len(tokens):
-        idx += 1
-    return result, idx
+    if peek() is not None:
+        advance()
+    return result
 
 
 def parse_file(filepath):
-    text = filepath.read_text(encoding="utf-8-sig")
-    toks = list(tokenize(text))
-    result = OrderedDict()
-    idx = 0
-    while idx < len(toks):
-        key = toks[idx]
-        idx += 1
-        if idx < len(toks) and toks[idx] == '=':
-            idx += 1
-            if idx < len(toks) and toks[idx] == '{':
-                val, idx = parse_block(toks, idx)
+    # Decode the raw bytes directly: outside quotes the tokenizer treats \r
+    # as whitespace, and tokenize() normalizes line endings inside quoted
+    # strings itself, so read_text's whole-file translation is not needed.
+    text = filepath.read_bytes().decode("utf-8-sig")
+    tok = _Peekable(tokenize(text))
+    peek = tok.peek
+    advance = tok.next
+    result = {}
+    while peek() is not None:
+        key = advance()
+        if peek() == '=':
+            advance()
+            if peek() == '{':
+                val = parse_block(tok)
             else:
-                val = toks[idx]
-                idx += 1
+                val = advance()
         else:
             val = True
         if key in result:
-            if isinstance(result[key], list):
-                result[key].append(val)
+            cur = result[key]
+            if isinstance(cur, list):
+                cur.append(val)
             else:
-                result[key] = [result[key], val]
+                result[key] = [cur, val]
         else:
             result[key] = val
     return result
 
 
+def _script_files(directory):
+    """Sorted *.txt files in directory, minus SKIP_FILES."""
+    return [f for f in sorted(directory.glob("*.txt")) if f.name.lower() not in SKIP_FILES]
+
+
+def _parse_files(paths):
+    """parse_file() over paths, results in the same order.
+
+    Files found unchanged in the parse cache are unpickled instead of
+    parsed. The rest are independent pure-Python CPU work, so on a
+    multi-core machine they are spread over a process pool.
+    """
+    if not cfg.PARSE_CACHE:
+        return _parse_uncached(paths)
+
+    cache = _load_parse_cache()
+    results = [None] * len(paths)
+    misses = []
+    for i, path in enumerate(paths):
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        blob = cache.get(key)
+        if blob is None:
+            misses.append((i, key))
+            continue
+        _parse_cache_live[key] = blob
+        results[i] = pickle.loads(blob)
+
+    parsed = _parse_uncached([paths[i] for i, _ in misses])
+    for (i, key), data in zip(misses, parsed):
+        # Pickle before anyone sees the result: _apply_inject mutates
+        # parsed blocks in place, and every later hit unpickles a fresh copy.
+        _parse_cache_live[key] = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        results[i] = data
+    return results
+
+
+def _parse_uncached(paths):
+    workers = min(len(paths), os.cpu_count() or 1)
+    if workers < 2:
+        return [parse_file(p) for p in paths]
+    # Batch several files per task so small files don't each pay a round trip.
+    chunksize = max(1, len(paths) // (workers * 4))
+    return list(_get_pool(workers).map(parse_file, paths, chunksize=chunksize))
+
+
+# One pool serves the PM parse and both building directory scans; main()
+# shuts it down once parsing is done, so worker start-up is usually paid
+# only once. The pool never has more workers than files to parse.
+_pool = None
+_pool_workers = 0
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    if _pool is not None and _pool_workers < workers:
+        _shutdown_pool()
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def _shutdown_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+
+
+# ═════════════════════════════════════════════════════════════════════════
+# Parse cache
+# ═════════════════════════════════════════════════════════════════════════
+# Maps (path, mtime_ns, size) -> pickled parse_file() result. Only entries
+# used by the current run are written back, so edited or deleted files drop
+# out. The whole cache is tagged with a hash of this script, so any change to
+# the parser invalidates it.
+
+_parse_cache = None
+_parse_cache_live = {}
+
+
+def _parser_version():
+    return hashlib.sha1(Path(__file__).read_bytes()).hexdigest()
+
+
+def _load_parse_cache():
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = {}
+        try:
+            with open(cfg.PARSE_CACHE, 'rb') as f:
+                version, entries = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"  WARNING: ignoring unreadable parse cache {cfg.PARSE_CACHE}: {e}")
+        else:
+            if version == _parser_version():
+                _parse_cache = entries
+    return _parse_cache
+
+
+def _save_parse_cache():
+    if not cfg.PARSE_CACHE or _parse_cache is None or _parse_cache_live == _parse_cache:
+        return
+    path = Path(cfg.PARSE_CACHE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _atomic_write(path, pickle.dumps((_parser_version(), _parse_cache_live), pickle.HIGHEST_PROTOCOL))
+
+
 # ═════════════════════════════════════════════════════════════════════════
 # Production methods parser
 # ═════════════════════════════════════════════════════════════════════════
 
 def parse_production_methods(vanilla_dir, mod_dir=None):
     """Return a dict pm_name -> { goods, no_upkeep, has_output, has_potential }."""
-    pms = {}
+    files = []
     for pm_dir in [vanilla_dir / "common" / "production_methods"]:
         if pm_dir.exists():
-            for f in sorted(pm_dir.iterdir()):
-                if f.name.endswith(".txt") and f.name.lower() not in SKIP_FILES:
-                    pms.update(_parse_pm_file(f))
+            files.extend(_script_files(pm_dir))
     if mod_dir:
         mod_pm_dir = mod_dir / "common" / "production_methods"
         if mod_pm_dir.exists():
-            for f in sorted(mod_pm_dir.iterdir()):
-                if f.name.endswith(".txt") and f.name.lower() not in SKIP_FILES:
-                    pms.update(_parse_pm_file(f))
+            files.extend(_script_files(mod_pm_dir))
+
+    pms = {}
+    for data in _parse_files(files):
+        pms.update(_pms_from_file(data))
     return pms
 
 
-def _parse_pm_file(filepath):
-    data = parse_file(filepath)
+def _pms_from_file(data):
     pms = {}
     for name, block in data.items():
         if name.startswith("REPLACE:"):
@@ -345,63 +492,87 @@ def _parse_pm_file(filepath):
         if not isinstance(block, dict):
             continue
         pm = {
-            'goods': OrderedDict(),
-            'no_upkeep': 'no_upkeep' in block and block['no_upkeep'] == 'yes',
+            'goods': _extract_goods(block),
+            'no_upkeep': block.get('no_upkeep') == 'yes',
             'has_output': 'produced' in block or 'output' in block,
             'has_potential': 'potential' in block,
         }
-        for k, v in block.items():
-            if k not in PM_META_KEYS and isinstance(v, str):
-                try:
-                    pm['goods'][k] = float(v)
-                except ValueError:
-                    pass
         pms[name] = pm
     return pms
 
 
+def _extract_goods(block):
+    """Numeric non-meta entries of a PM block, as good -> amount."""
+    goods = {}
+    for k, v in block.items():
+        if k not in PM_META_KEYS and isinstance(v, str) and _NUM_RE.fullmatch(v):
+            goods[k] = float(v)
+    return goods
+
+
 # ═════════════════════════════════════════════════════════════════════════
 # Building types parser (with mod overlay)
 # ═════════════════════════════════════════════════════════════════════════
 
+@dataclass
+class Building:
+    __slots__ = ('file', 'estate', 'is_foreign', 'employment_size',
+                 'possible_pms', 'unique_pms', 'raw')
+
+    file: Path
+    estate: Optional[str]
+    is_foreign: bool
+    employment_size: Optional[str]
+    possible_pms: list
+    unique_pms: dict
+    raw: dict  # parsed block, with INJECT overlays merged in
+
+
 def _parse_building_block(bname, block, source_file):
-    b = {
-        'file': source_file,
-        'estate': block.get('estate'),
-        'is_foreign': block.get('is_foreign') == 'yes',
-        'employment_size': block.get('employment_size'),
-        'possible_pms': [],
-        'unique_pms': OrderedDict(),
-        'raw': block,
-    }
-    ppm = block.get('possible_production_methods')
+    get = block.get
+    ppm = get('possible_production_methods')
     if isinstance(ppm, dict):
-        b['possible_pms'] = list(ppm.keys())
+        possible_pms = list(ppm)
     elif isinstance(ppm, list):
-        b['possible_pms'] = ppm
-
-    upm = block.get('unique_production_methods')
+        possible_pms = ppm
+    else:
+        possible_pms = []
+    b = Building(
+        file=source_file,
+        estate=get('estate'),
+        is_foreign=get('is_foreign') == 'yes',
+        employment_size=get('employment_size'),
+        possible_pms=possible_pms,
+        unique_pms={},
+        raw=block,
+    )
+
+    upm = get('unique_production_methods')
     if isinstance(upm, dict):
         for pm_name, pm_block in upm.items():
             if isinstance(pm_block, dict):
-                goods = OrderedDict()
-                for k, v in pm_block.items():
-                    if k not in PM_META_KEYS and isinstance(v, str):
-                        try:
-                            goods[k] = float(v)
-                        except ValueError:
-                            pass
-                b['unique_pms'][pm_name] = {
-                    'goods': goods,
-                    'has_output': 'produced' in pm_block or 'output' in pm_block,
-                    'no_upkeep': pm_block.get('no_upkeep') == 'yes',
-                    'is_maintenance': pm_block.get('category') == 'building_maintenance',
-                }
+                b.unique_pms[pm_name] = _unique_pm(pm_block)
     return b
 
 
+def _unique_pm(pm_block):
+    get = pm_block.get
+    return {
+        'goods': _extract_goods(pm_block),
+        'has_output': 'produced' in pm_block or 'output' in pm_block,
+        'no_upkeep': get('no_upkeep') == 'yes',
+        'is_maintenance': get('category') == 'building_maintenance',
+    }
+
+
+BUILDING_SHAPE_FIELDS = frozenset({
+    'category', 'max_levels', 'pop_type', 'is_foreign', 'is_special',
+    'employment_size', 'possible_production_methods',
+})
+
+
 def _scan_building_dir(directory):
-    buildings = OrderedDict()
+    buildings = {}
     injects = []
     replaces = []
     files_present = set()
@@ -410,18 +581,10 @@ def _scan_building_dir(directory):
         f"{PREFIX}_generated_crown_inject.txt",
     }
 
-    BUILDING_SHAPE_FIELDS = {
-        'category', 'max_levels', 'pop_type', 'is_foreign', 'is_special',
-        'employment_size', 'possible_production_methods',
-    }
+    files = [f for f in _script_files(directory) if f.name not in generator_outputs]
+    files_present.update(f.name for f in files)
 
-    for f in sorted(directory.iterdir()):
-        if f.name in generator_outputs:
-            continue
-        if f.name.lower() in SKIP_FILES or not f.name.endswith(".txt"):
-            continue
-        files_present.add(f.name)
-        data = parse_file(f)
+    for f, data in zip(files, _parse_files(files)):
         for key, block in data.items():
             if not isinstance(block, dict):
                 continue
@@ -430,7 +593,7 @@ def _scan_building_dir(directory):
             elif key.startswith("REPLACE:"):
                 replaces.append((key[8:], block, f))
             else:
-                if not (BUILDING_SHAPE_FIELDS & block.keys()):
+                if BUILDING_SHAPE_FIELDS.isdisjoint(block):
                     continue
                 buildings[key] = _parse_building_block(key, block, f)
 
@@ -439,39 +602,27 @@ def _scan_building_dir(directory):
 
 def _apply_inject(building, inject_block):
     block = inject_block
-    raw = building['raw']
+    raw = building.raw
 
     for k, v in block.items():
         if k == 'possible_production_methods' and isinstance(v, dict):
-            ppm = raw.get('possible_production_methods', OrderedDict())
+            ppm = raw.get('possible_production_methods', {})
             if not isinstance(ppm, dict):
-                ppm = OrderedDict()
+                ppm = {}
             ppm.update(v)
             raw['possible_production_methods'] = ppm
-            building['possible_pms'] = list(ppm.keys())
+            building.possible_pms = list(ppm)
         elif k == 'unique_production_methods' and isinstance(v, dict):
-            upm = raw.get('unique_production_methods', OrderedDict())
+            upm = raw.get('unique_production_methods', {})
             if not isinstance(upm, dict):
-                upm = OrderedDict()
+                upm = {}
             upm.update(v)
             raw['unique_production_methods'] = upm
             for pm_name, pm_block in v.items():
                 if isinstance(pm_block, dict):
-                    goods = OrderedDict()
-                    for gk, gv in pm_block.items():
-                        if gk not in PM_META_KEYS and isinstance(gv, str):
-                            try:
-                                goods[gk] = float(gv)
-                            except ValueError:
-                                pass
-                    building['unique_pms'][pm_name] = {
-                        'goods': goods,
-                        'has_output': 'produced' in pm_block or 'output' in pm_block,
-                        'no_upkeep': pm_block.get('no_upkeep') == 'yes',
-                        'is_maintenance': pm_block.get('category') == 'building_maintenance',
-                    }
+                    building.unique_pms[pm_name] = _unique_pm(pm_block)
         elif k == 'estate':
-            building['estate'] = v
+            building.estate = v
             raw['estate'] = v
         else:
             raw[k] = v
@@ -493,10 +644,10 @@ def parse_all_buildings(vanilla_dir, mod_dir=None):
 
             replaced_files = vanilla_files & mod_files
             if replaced_files:
-                buildings = OrderedDict(
-                    (k, v) for k, v in buildings.items()
-                    if v['file'].name not in replaced_files
-                )
+                buildings = {
+                    k: v for k, v in buildings.items()
+                    if v.file.name not in replaced_files
+                }
                 print(f"  mod replaces {len(replaced_files)} vanilla file(s): {', '.join(sorted(replaced_files))}")
 
             buildings.update(mod_buildings)
@@ -519,26 +670,26 @@ def parse_all_buildings(vanilla_dir, mod_dir=None):
 # Classification
 # ═════════════════════════════════════════════════════════════════════════
 
-CROWN_MODIFIER_KEYS = {
+CROWN_MODIFIER_KEYS = frozenset({
     'local_max_control',
     'global_max_control',
     'local_crown_estate_power',
     'global_crown_estate_power',
     'local_proximity_source',
-}
+})
 
-CROWN_TRIGGER_KEYS = {'fort_level', 'minimum_fort_level'}
+CROWN_TRIGGER_KEYS = frozenset({'fort_level', 'minimum_fort_level'})
 
-FORT_KEYS = {'fort_level', 'minimum_fort_level'}
+FORT_KEYS = frozenset({'fort_level', 'minimum_fort_level'})
 
-TRIGGER_BLOCK_KEYS = {
+TRIGGER_BLOCK_KEYS = frozenset({
     'country_potential',
     'location_potential',
     'international_organization_potential',
     'remove_if',
     'trigger',
     'potential',
-}
+})
 
 
 def _scan_for_crown(obj):
@@ -548,12 +699,8 @@ def _scan_for_crown(obj):
                 continue
             if k in CROWN_TRIGGER_KEYS:
                 return True
-            if k in CROWN_MODIFIER_KEYS and isinstance(v, str):
-                try:
-                    if float(v) > 0:
-                        return True
-                except ValueError:
-                    pass
+            if k in CROWN_MODIFIER_KEYS and _is_numeric(v) and float(v) > 0:
+                return True
             if _scan_for_crown(v):
                 return True
     elif isinstance(obj, list):
@@ -564,7 +711,7 @@ def _scan_for_crown(obj):
 
 
 def _is_fort_building(building):
-    raw = building['raw']
+    raw = building.raw
     return _scan_for_fort(raw)
 
 
@@ -585,16 +732,23 @@ def _scan_for_fort(obj):
 
 
 def _is_crown_building(building):
-    if building.get('estate') is not None:
+    if building.estate is not None:
         return False
-    raw = building['raw']
+    raw = building.raw
     if raw.get('category') == 'government_category':
         return True
     return _scan_for_crown(raw)
 
 
+class QualifyingBuilding(NamedTuple):
+    name: str
+    is_foreign: bool
+    estate: Optional[str]
+    employment_size: Optional[str]
+
+
 def classify(buildings, pms):
-    all_pm_goods = OrderedDict()
+    all_pm_goods = {}
 
     for pm_name, pm in pms.items():
         if pm['no_upkeep'] or pm['has_output']:
@@ -607,12 +761,13 @@ def classify(buildings, pms):
     crown_buildings = []
     crown_with_pm = 0
     fort_excluded = []
+    referenced_pms = set()
     for bname, b in buildings.items():
         if _is_fort_building(b):
             fort_excluded.append(bname)
             continue
 
-        for pm_name, pm_data in b['unique_pms'].items():
+        for pm_name, pm_data in b.unique_pms.items():
             if not pm_data.get('is_maintenance', False):
                 continue
             if pm_data.get('no_upkeep', False) or pm_data.get('has_output', False):
@@ -621,16 +776,10 @@ def classify(buildings, pms):
                 continue
             all_pm_goods[pm_name] = pm_data['goods']
 
-        has_tracked = False
-        for pm_name in b['possible_pms']:
-            if pm_name in all_pm_goods:
-                has_tracked = True
-                break
-        if not has_tracked:
-            for pm_name in b['unique_pms']:
-                if pm_name in all_pm_goods:
-                    has_tracked = True
-                    break
+        # isdisjoint stops at the first tracked PM, without a Python-level loop.
+        tracked = all_pm_goods.keys()
+        has_tracked = not (tracked.isdisjoint(b.possible_pms)
+                           and tracked.isdisjoint(b.unique_pms))
 
         if _is_crown_building(b):
             crown_buildings.append(bname)
@@ -638,18 +787,13 @@ def classify(buildings, pms):
                 crown_with_pm += 1
 
         if has_tracked:
-            qualifying.append((bname, b['is_foreign'], b['estate'], b.get('employment_size')))
-
-    used_pms = set()
-    for bname, _is_foreign, _estate, _emp in qualifying:
-        b = buildings[bname]
-        for pm_name in b['possible_pms']:
-            if pm_name in all_pm_goods:
-                used_pms.add(pm_name)
-        for pm_name in b['unique_pms']:
-            if pm_name in all_pm_goods:
-                used_pms.add(pm_name)
-    orphaned_pms = set(all_pm_goods.keys()) - used_pms
+            qualifying.append(QualifyingBuilding(bname, b.is_foreign, b.estate, b.employment_size))
+            # A later building's unique PM may still join all_pm_goods, so
+            # collect every reference now and prune against the final set.
+            referenced_pms.update(b.possible_pms)
+            referenced_pms.update(b.unique_pms)
+
+    orphaned_pms = all_pm_goods.keys() - referenced_pms
     if orphaned_pms:
         for pm_name in orphaned_pms:
             del all_pm_goods[pm_name]
@@ -662,16 +806,19 @@ def classify(buildings, pms):
         print(f"  classified {len(crown_buildings)} crown building(s)")
         print(f"    of which {crown_with_pm} have a maintenance PM")
 
-    qualifying_names = {q[0] for q in qualifying}
+    qualifying_names = {q.name for q in qualifying}
     estate_no_pm = []
     for bname, b in buildings.items():
-        if b['estate'] is not None and bname not in qualifying_names:
-            estate_no_pm.append((bname, b['estate']))
+        if b.estate is not None and bname not in qualifying_names:
+            estate_no_pm.append((bname, b.estate))
     if estate_no_pm:
         print(f"\n  WARNING: {len(estate_no_pm)} estate building(s) have no qualifying maintenance PM:")
-        for bname, estate in sorted(estate_no_pm):
-            print(f"    {bname} (estate={estate})")
-        print()
+        print("".join(f"    {bname} (estate={estate})\n" for bname, estate in sorted(estate_no_pm)))
+
+    # Every consumer walks these in name order; sort once here.
+    qualifying.sort(key=attrgetter('name'))
+    all_pm_goods = dict(sorted(all_pm_goods.items()))
+    crown_buildings.sort()
 
     return qualifying, all_pm_goods, crown_buildings
 
@@ -681,31 +828,26 @@ def classify(buildings, pms):
 # ═════════════════════════════════════════════════════════════════════════
 
 def generate_crown_inject(crown_buildings):
-    lines = list(GENERATED_HEADER_LINES)
-    lines.append("# INJECT cosmetic 'Crown Building' modifier onto government /")
-    lines.append("# fort / crown-power-granting buildings.")
-    lines.append("")
-
-    for bname in sorted(crown_buildings):
-        lines.append(f"INJECT:{bname} = {{")
-        lines.append("\tmodifier = {")
-        lines.append(f"\t\t{_p('crown_building')} = yes")
-        lines.append("\t}")
-        lines.append("}")
-        lines.append("")
+    buf = io.StringIO()
+    w = buf.write
+    for line in GENERATED_HEADER_LINES:
+        w(line + "\n")
+    w("# INJECT cosmetic 'Crown Building' modifier onto government /\n"
+      "# fort / crown-power-granting buildings.\n")
 
-    return "\n".join(lines)
+    flag = _p('crown_building')
+    for bname in crown_buildings:
+        w(f"\nINJECT:{bname} = {{\n\tmodifier = {{\n\t\t{flag} = yes\n\t}}\n}}\n")
 
+    return buf.getvalue()
 
 
 def _resolve_employment(emp_name, emp_vals):
     """Resolve an employment_size field to a numeric value."""
     if emp_name is None:
         return 0
-    try:
+    if _is_numeric(emp_name):
         return float(emp_name)
-    except (ValueError, TypeError):
-        pass
     return emp_vals.get(emp_name, 0)
 
 
@@ -715,62 +857,59 @@ def generate_init_effects(qualifying, all_pm_goods, crown_buildings, employment_
     estate_map = _p('estate_map')
     crown_map = _p('crown_map')
     tracked_types = _p('tracked_types')
-
-    lines = list(GENERATED_HEADER_LINES)
-    lines.append("")
-
-    lines.append("# Called once at game start: clear globals, then register one pooled")
-    lines.append(f"# location per maintenance PM via {_p('register_pm')}.")
-    lines.append(f"{_p('stamp_globals')} = {{")
-    lines.append(f"\tclear_global_variable_list = {all_pm_dicts}")
-    lines.append(f"\tclear_global_variable_map = {profiles}")
-    lines.append(f"\tclear_global_variable_map = {estate_map}")
-    lines.append(f"\tclear_global_variable_map = {crown_map}")
-    lines.append(f"\tclear_global_variable_map = {tracked_types}")
-    lines.append("")
-
-    for pm_name in sorted(all_pm_goods.keys()):
-        pm_goods = all_pm_goods[pm_name]
-        lines.append(f"\t{_p('register_pm')} = {{")
-        lines.append(f"\t\tpm = {pm_name}")
-        lines.append(f"\t\tgoods_block = \"")
+    register_pm = _p('register_pm')
+    good_key = _p('good')
+
+    buf = io.StringIO()
+    w = buf.write
+    for line in GENERATED_HEADER_LINES:
+        w(line + "\n")
+    w("\n")
+
+    w("# Called once at game start: clear globals, then register one pooled\n")
+    w(f"# location per maintenance PM via {register_pm}.\n")
+    w(f"{_p('stamp_globals')} = {{\n")
+    w(f"\tclear_global_variable_list = {all_pm_dicts}\n")
+    w(f"\tclear_global_variable_map = {profiles}\n")
+    w(f"\tclear_global_variable_map = {estate_map}\n")
+    w(f"\tclear_global_variable_map = {crown_map}\n")
+    w(f"\tclear_global_variable_map = {tracked_types}\n")
+    w("\n")
+
+    for pm_name, pm_goods in all_pm_goods.items():
+        w(f"\t{register_pm} = {{\n\t\tpm = {pm_name}\n\t\tgoods_block = \"\n")
         for good, amount in pm_goods.items():
-            lines.append(f"\t\t\t{_p('good')} = {{ good = {good} amount = {amount} }}")
-        lines.append("\t\t\"")
-        lines.append("\t}")
+            w(f"\t\t\t{good_key} = {{ good = {good} amount = {amount} }}\n")
+        w("\t\t\"\n\t}\n")
 
     # Tracked building types with employment-per-level
     emp_vals = employment_values or {}
-    lines.append("")
-    lines.append(f"\t# Tracked building types (value = employment per level, in thousands)")
-    for bname, _is_foreign, _estate, emp_name in sorted(qualifying, key=lambda x: x[0]):
-        bt_ref = f"building_type:{bname}"
-        emp_val = _resolve_employment(emp_name, emp_vals)
-        lines.append(f"\tadd_to_global_variable_map = {{ name = {tracked_types} key = {bt_ref} value = {emp_val} }}")
+    w("\n")
+    w("\t# Tracked building types (value = employment per level, in thousands)\n")
+    for q in qualifying:
+        emp_val = _resolve_employment(q.employment_size, emp_vals)
+        w(f"\tadd_to_global_variable_map = {{ name = {tracked_types} key = building_type:{q.name} value = {emp_val} }}\n")
 
     # Estate-assignment map
-    estate_buildings = [(b, e) for b, _, e, _ in qualifying if e is not None]
+    estate_buildings = [(q.name, q.estate) for q in qualifying if q.estate is not None]
     if estate_buildings:
-        lines.append("")
-        lines.append(f"\t# Estate-assigned buildings: charge full cost to the named estate")
-        for bname, estate in sorted(estate_buildings):
-            bt_ref = f"building_type:{bname}"
-            lines.append(f"\tadd_to_global_variable_map = {{ name = {estate_map} key = {bt_ref} value = estate_type:{estate} }}")
+        w("\n")
+        w("\t# Estate-assigned buildings: charge full cost to the named estate\n")
+        for bname, estate in estate_buildings:
+            w(f"\tadd_to_global_variable_map = {{ name = {estate_map} key = building_type:{bname} value = estate_type:{estate} }}\n")
 
     # Crown-routing map
-    qualifying_crown = sorted(b for b in crown_buildings
-                              if b in {q[0] for q in qualifying})
+    qualifying_names = {q.name for q in qualifying}
+    qualifying_crown = [b for b in crown_buildings if b in qualifying_names]
     if qualifying_crown:
-        lines.append("")
-        lines.append(f"\t# Crown buildings: upkeep routed to the crown-total bucket")
+        w("\n")
+        w("\t# Crown buildings: upkeep routed to the crown-total bucket\n")
         for bname in qualifying_crown:
-            bt_ref = f"building_type:{bname}"
-            lines.append(f"\tadd_to_global_variable_map = {{ name = {crown_map} key = {bt_ref} value = yes }}")
+            w(f"\tadd_to_global_variable_map = {{ name = {crown_map} key = building_type:{bname} value = yes }}\n")
 
-    lines.append("}")
-    lines.append("")
+    w("}\n")
 
-    return "\n".join(lines)
+    return buf.getvalue()
 
 
 # ═════════════════════════════════════════════════════════════════════════
@@ -792,24 +931,33 @@ def main():
 
     if CHECK_MODE:
         print("-- CHECK MODE (read-only) --")
-    print(f"Vanilla: {vanilla_dir}")
-    print(f"Mod:     {mod_dir}")
-    print(f"Output:  {output_dir}")
+    print(
+        f"Vanilla: {vanilla_dir}\n"
+        f"Mod:     {mod_dir}\n"
+        f"Output:  {output_dir}"
+    )
 
-    # ── Stage 1: Parse production methods ──
-    print("")
-    print("Parsing production methods...")
-    pms = parse_production_methods(vanilla_dir, mod_dir)
-    print(f"  found {len(pms)} production methods")
-    qualifying_pms = {k: v for k, v in pms.items()
-                      if not v['no_upkeep'] and not v['has_output'] and v['goods']}
-    print(f"  qualifying PMs (has goods, no no_upkeep, no output): {len(qualifying_pms)}")
-
-    # ── Stage 2: Parse all buildings ──
-    print("")
-    print("Parsing building types...")
-    buildings = parse_all_buildings(vanilla_dir, mod_dir)
-    print(f"  found {len(buildings)} buildings")
+    try:
+        # ── Stage 1: Parse production methods ──
+        print("")
+        print("Parsing production methods...")
+        pms = parse_production_methods(vanilla_dir, mod_dir)
+        qualifying_pms = {k: v for k, v in pms.items()
+                          if not v['no_upkeep'] and not v['has_output'] and v['goods']}
+        print(
+            f"  found {len(pms)} production methods\n"
+            f"  qualifying PMs (has goods, no no_upkeep, no output): {len(qualifying_pms)}"
+        )
+
+        # ── Stage 2: Parse all buildings ──
+        print("")
+        print("Parsing building types...")
+        buildings = parse_all_buildings(vanilla_dir, mod_dir)
+        print(f"  found {len(buildings)} buildings")
+    finally:
+        _shutdown_pool()
+    if not CHECK_MODE:
+        _save_parse_cache()
 
     # ── Stage 2b: Parse employment values ──
     print("")
@@ -821,28 +969,41 @@ def main():
     print("")
     print("Classifying qualifying buildings...")
     qualifying, all_pm_goods, crown_buildings = classify(buildings, pms)
-    print(f"  qualifying buildings:      {len(qualifying)}")
-    print(f"  crown buildings:           {len(crown_buildings)}")
-    print(f"  unique PM goods profiles:  {len(all_pm_goods)}")
-
-    non_foreign = [q for q in qualifying if not q[1]]
-    foreign_count = sum(1 for q in qualifying if q[1])
-    estate_count = sum(1 for q in qualifying if q[2] is not None)
-
-    missing_emp = [q[0] for q in qualifying if _resolve_employment(q[3], employment_values) == 0]
+    print(
+        f"  qualifying buildings:      {len(qualifying)}\n"
+        f"  crown buildings:           {len(crown_buildings)}\n"
+        f"  unique PM goods profiles:  {len(all_pm_goods)}"
+    )
+
+    foreign_count = 0
+    estate_count = 0
+    missing_emp = []
+    for q in qualifying:
+        if q.is_foreign:
+            foreign_count += 1
+        if q.estate is not None:
+            estate_count += 1
+        if _resolve_employment(q.employment_size, employment_values) == 0:
+            missing_emp.append(q.name)
+    non_foreign_count = len(qualifying) - foreign_count
     if missing_emp:
-        print(f"  WARNING: {len(missing_emp)} building(s) missing employment value:")
-        for b in sorted(missing_emp)[:10]:
-            print(f"    {b}")
+        warning = [f"  WARNING: {len(missing_emp)} building(s) missing employment value:"]
+        warning.extend(f"    {b}" for b in sorted(missing_emp)[:10])
         if len(missing_emp) > 10:
-            print(f"    ... and {len(missing_emp) - 10} more")
-    print(f"  Non-foreign buildings:     {len(non_foreign)}")
-    print(f"  Foreign buildings:         {foreign_count}")
-    print(f"  Estate-assigned:           {estate_count}")
+            warning.append(f"    ... and {len(missing_emp) - 10} more")
+        print("\n".join(warning))
+    print(
+        f"  Non-foreign buildings:     {non_foreign_count}\n"
+        f"  Foreign buildings:         {foreign_count}\n"
+        f"  Estate-assigned:           {estate_count}"
+    )
 
     # ── Output subdirectories ──
     out_effects = output_dir / "in_game" / "common" / "scripted_effects"
     out_buildings = output_dir / "in_game" / "common" / "building_types"
+    if not CHECK_MODE:
+        for out_sub in (out_effects, out_buildings):
+            out_sub.mkdir(parents=True, exist_ok=True)
 
     # ── Stage 4: Init effects ──
     print("")
@@ -854,8 +1015,8 @@ def main():
 
     # ── Stage 5a: Crown building cosmetic flag ──
     crown_inject_path = out_buildings / f"{PREFIX}_generated_crown_inject.txt"
-    qualifying_names = {q[0] for q in qualifying}
-    qualifying_crown = sorted(b for b in crown_buildings if b in qualifying_names)
+    qualifying_names = {q.name for q in qualifying}
+    qualifying_crown = [b for b in crown_buildings if b in qualifying_names]
     if qualifying_crown:
         print("")
         print(f"Generating crown-building flag for {len(qualifying_crown)} building(s)...")
@@ -878,34 +1039,35 @@ def main():
         _delete_stale(stale_path)
 
     # ── Summary ──
-    print("")
-    print("=== Summary ===")
-    print(f"Total qualifying buildings:   {len(qualifying)}")
-    print(f"  Non-foreign:               {len(non_foreign)}")
-    print(f"  Foreign:                   {foreign_count}")
-    print(f"  Estate-assigned:           {estate_count}")
-    print(f"Unique PM goods profiles:    {len(all_pm_goods)}")
-    print(f"Tracked building types:      {len(qualifying)}")
-
-    all_goods = set()
-    for good_dict in all_pm_goods.values():
-        all_goods.update(good_dict.keys())
-    print(f"Distinct maintenance goods:  {len(all_goods)} ({', '.join(sorted(all_goods))})")
+    all_goods = {good for good_dict in all_pm_goods.values() for good in good_dict}
+    total = len(qualifying)
+    print(
+        "\n"
+        "=== Summary ===\n"
+        f"Total qualifying buildings:   {total}\n"
+        f"  Non-foreign:               {non_foreign_count}\n"
+        f"  Foreign:                   {foreign_count}\n"
+        f"  Estate-assigned:           {estate_count}\n"
+        f"Unique PM goods profiles:    {len(all_pm_goods)}\n"
+        f"Tracked building types:      {total}\n"
+        f"Distinct maintenance goods:  {len(all_goods)} ({', '.join(sorted(all_goods))})"
+    )
 
     if CHECK_MODE:
         print("")
         if _check_diffs:
-            print(f"=== CHECK FAILED: {len(_check_diffs)} file(s) out of sync ===")
+            report = [f"=== CHECK FAILED: {len(_check_diffs)} file(s) out of sync ==="]
             for path, kind in sorted(_check_diffs, key=lambda p: str(p[0])):
                 try:
                     rel = path.relative_to(output_dir)
                 except ValueError:
                     rel = path
                 label = {'changed': 'changed ', 'missing': 'missing ', 'stale': 'stale   '}.get(kind, kind)
-                print(f"  [{label}] {rel}")
-            print("")
-            print("Run the generator locally and commit the result:")
-            print("  python3 tools/epbm_generator/generate_building_hooks.py")
+                report.append(f"  [{label}] {rel}")
+            report.append("")
+            report.append("Run the generator locally and commit the result:")
+            report.append("  python3 tools/epbm_generator/generate_building_hooks.py")
+            print("\n".join(report))
             return 2
         print("=== CHECK PASSED: tree is in sync ===")
         return 0
@@ -5,6 +5,7 @@ import re
 from pathlib import Path
 
 ON_ACTIONS_REL = Path("in_game/common/on_action/epbm_on_actions.txt")
+REBUILD_VERSION_RE = re.compile(r"@epbm_rebuild_version\s*=\s*\d+")
 
 
 def version_to_rebuild(version_str):
@@ -22,14 +23,20 @@ def post_deploy(src, dst, meta):
     on_actions_file = dst / ON_ACTIONS_REL
     if not on_actions_file.exists():
         return
-    text = on_actions_file.read_text(encoding="utf-8-sig")
-    text, count = re.subn(
-        r"@epbm_rebuild_version\s*=\s*\d+",
+    raw = on_actions_file.read_bytes()
+    # Skip decoding and the regex entirely when the define is absent.
+    if b"@epbm_rebuild_version" not in raw:
+        print(f"  WARNING: @epbm_rebuild_version not found in {ON_ACTIONS_REL}")
+        return
+    text = raw.decode("utf-8-sig")
+    patched, count = REBUILD_VERSION_RE.subn(
         f"@epbm_rebuild_version = {rebuild_ver}",
         text,
     )
-    if count > 0:
-        on_actions_file.write_text(text, encoding="utf-8-sig")
-        print(f"  Patched @epbm_rebuild_version = {rebuild_ver} (from {version_str})")
-    else:
+    if count == 0:
         print(f"  WARNING: @epbm_rebuild_version not found in {ON_ACTIONS_REL}")
+    elif patched == text:
+        print(f"  @epbm_rebuild_version already {rebuild_ver}, left unchanged")
+    else:
+        on_actions_file.write_bytes(patched.encode("utf-8-sig"))
+        print(f"  Patched @epbm_rebuild_version = {rebuild_ver} (from {version_str})")